@@ -2,65 +2,683 @@
 """
 Generador de imágenes para landing pages usando Imagen 4.0 de Google.
 Basado en el skill landing-image-generator.
+
+Los módulos pesados (google-genai, Pillow, NumPy, PyYAML) se importan solo
+cuando hacen falta: `--check` y las ejecuciones sin nada pendiente terminan
+sin cargarlos ni crear el cliente de la API.
 """
 
 import os
 import sys
-import yaml
-import base64
+import json
+import time
+import argparse
+import threading
+from collections import deque
 from pathlib import Path
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 
-# Cargar variables de entorno
-load_dotenv()
+from generation_cache import GenerationCache, cache_key
+from image_encoding import (
+    avif_available,
+    encode_image,
+    encode_options,
+    encode_pool,
+    encoding_available,
+    planned_files,
+)
+from image_scoring import pick_best, scoring_available
+from imagen_backends import FakeBackend, GenaiBackend, LazyBackend
+from manifest import MAX_CANDIDATES, ManifestError, expand, scan, stream
+from output_lock import (
+    ADOPTED,
+    DEFAULT_LOCK,
+    OutputLock,
+    encode_digest,
+    file_digest,
+    verify_file,
+)
+from retry_policy import RetryPolicy, classify
+from run_report import Profiler, build_report, write_report
+from run_journal import RunJournal
 
-try:
-    from google import genai
-    from google.genai import types
-except ImportError:
-    print("❌ Error: google-genai no está instalado")
-    print("💡 Ejecuta: pip install google-genai")
-    sys.exit(1)
+MODEL = "imagen-4.0-generate-001"
+SAFETY_FILTER_LEVEL = "block_low_and_above"
+COST_PER_IMAGE = 0.04  # USD, Imagen 4.0 standard
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "images"
+DEFAULT_ARCHIVE_DIR = Path(__file__).resolve().parent / ".cache" / "candidates"
+DEFAULT_JOURNAL = Path(__file__).resolve().parent / ".cache" / "journal.jsonl"
+FAKE_DIR = Path(__file__).resolve().parent / ".cache" / "fake"
 
+# Rutas por backend: el fake nunca comparte caché, lock ni salidas con el real
+BACKEND_PATHS = {
+    "genai": {
+        "cache_dir": DEFAULT_CACHE_DIR,
+        "archive_dir": DEFAULT_ARCHIVE_DIR,
+        "journal": DEFAULT_JOURNAL,
+        "lock": DEFAULT_LOCK,
+        "output_root": None,
+    },
+    "fake": {
+        "cache_dir": FAKE_DIR / "images",
+        "archive_dir": FAKE_DIR / "candidates",
+        "journal": FAKE_DIR / "journal.jsonl",
+        "lock": FAKE_DIR / "generated-images.lock.json",
+        "output_root": FAKE_DIR / "outputs",
+    },
+}
 
-def generate_image(client, prompt, aspect_ratio="4:3"):
-    """Genera una imagen usando Imagen 4.0"""
-    try:
-        response = client.models.generate_images(
-            model="imagen-4.0-generate-001",
-            prompt=prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=1,
-                aspect_ratio=aspect_ratio,
-                safety_filter_level="block_low_and_above",
-            ),
+
+class RateLimiter:
+    """Token bucket para limitar las peticiones por minuto a la API.
+
+    `burst` es el número de peticiones que pueden salir de golpe; con el valor
+    por defecto (1) las peticiones se reparten uniformemente en el minuto.
+    """
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible (0 rpm = sin límite).
+
+        Devuelve los segundos que ha tenido que esperar.
+        """
+        if not self.rate:
+            return 0.0
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def generate_image(backend, prompt, aspect_ratio="4:3", number_of_images=1, log=print):
+    """Genera `number_of_images` candidatas en una sola llamada al backend.
+
+    Devuelve la lista de imágenes, o None si la API no devolvió ninguna (los
+    filtros de seguridad bloquearon el prompt). Los errores de la API se
+    propagan para que `request_images` decida si reintentar.
+    """
+    images = backend.generate(prompt, aspect_ratio, number_of_images)
+    if images:
+        return images
+    log("   🚫 Bloqueada por los filtros de seguridad (no se reintenta)")
+    return None
+
+
+def request_images(ctx, prompt, aspect_ratio, number_of_images, stats, log=print):
+    """Llama a `generate_image` aplicando la política de reintentos.
+
+    Devuelve las imágenes o None. En `stats` acumula intentos, latencia de la
+    API, espera en el limitador e imágenes facturadas.
+    """
+    while True:
+        stats["attempts"] += 1
+        stats["throttled"] += ctx.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            images = ctx.profiler.call(
+                generate_image,
+                ctx.backend,
+                prompt,
+                aspect_ratio,
+                number_of_images,
+                log=log,
+            )
+        except Exception as e:
+            error = e
+        else:
+            stats["billed_images"] += len(images or [])
+            return images
+        finally:
+            # Solo la llamada: la espera de backoff no es latencia de la API
+            stats["api_latency"] += time.perf_counter() - start
+
+        if not ctx.retry.should_retry(error, stats["attempts"]):
+            log(f"❌ Error generando imagen ({classify(error)}): {error}")
+            return None
+        wait = ctx.retry.delay(error, stats["attempts"])
+        log(
+            f"   ⏳ Reintento {stats['attempts']}/{ctx.retry.max_retries} "
+            f"en {wait:.1f}s: {error}"
         )
+        time.sleep(wait)
 
-        if response.generated_images and len(response.generated_images) > 0:
-            return response.generated_images[0].image
-        return None
-    except Exception as e:
-        print(f"❌ Error generando imagen: {e}")
-        return None
 
+def save_image(image_bytes, output_path, log=print, pool=None, options=None):
+    """Guarda la imagen generada.
 
-def save_image(image_data, output_path):
-    """Guarda la imagen generada"""
+    Con `pool` la imagen se recodifica (WebP/AVIF + variantes responsive) en
+    el pool de procesos; sin él se escriben los bytes tal cual llegan de la API.
+    Devuelve la lista de (ruta, bytes escritos), o None si falló.
+    """
     try:
+        if pool is not None:
+            written = encode_image(pool, image_bytes, output_path, options)
+            total = sum(size for _, size in written)
+            log(f"   🗜️  Codificadas {len(written)} variantes ({total / 1024:.0f} KB)")
+            return written
+
         # Crear directorio si no existe
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
 
         # Guardar imagen
         with open(output_path, "wb") as f:
-            f.write(image_data.image_bytes)
+            f.write(image_bytes)
 
-        return True
+        return [(output_path, len(image_bytes))]
     except Exception as e:
-        print(f"❌ Error guardando imagen: {e}")
-        return False
+        log(f"❌ Error guardando imagen: {e}")
+        return None
 
 
-def main():
+def image_key(img_config, backend="genai"):
+    """Clave de caché de una entrada del manifiesto.
+
+    Para genai la clave no incluye el backend, así las cachés existentes
+    siguen valiendo; cualquier otro backend tiene sus propias claves.
+    """
+    return cache_key(
+        MODEL if backend == "genai" else f"{backend}/{MODEL}",
+        img_config.get("prompt", ""),
+        img_config.get("aspect_ratio", "4:3"),
+        SAFETY_FILTER_LEVEL,
+    )
+
+
+def output_encoding(img_config, encode=True):
+    """Hash de la codificación con la que se escribe una entrada"""
+    return encode_digest(encode_options(img_config) if encode else None)
+
+
+def stale_outputs(lock, manifest, only=None, encode=True, backend="genai"):
+    """Parsea un manifiesto y lo compara con el lock: (salidas, problemas)"""
+    outputs = []
+    problems = []
+
+    def visit(img):
+        outputs.append(img["output"])
+        key = image_key(img, backend)
+        encoding = output_encoding(img, encode)
+        problems.extend(
+            lock.problems(img["output"], key, encoding, accept_adopted=True)
+        )
+
+    plan = scan([manifest], only=only, visit=visit)
+    return outputs, plan.errors + problems
+
+
+def check_outputs(lock, manifests, only=None, encode=True, backend="genai"):
+    """Modo `--check`: lista de salidas que faltan o no están al día"""
+    problems = []
+    for manifest in manifests:
+        outputs = None
+        if not only:
+            outputs = lock.manifest_outputs(manifest, file_digest(manifest), encode)
+        if outputs is not None:
+            # Manifiesto sin cambios: basta con comprobar los ficheros
+            for output in outputs:
+                problems.extend(lock.problems(output))
+        else:
+            problems.extend(stale_outputs(lock, manifest, only, encode, backend)[1])
+    return problems
+
+
+def existing_files(path, options=None):
+    """(ruta, bytes) de `path` y de las variantes que escribiría el encoder.
+
+    Solo mira qué existe en disco, sin abrir las imágenes.
+    """
+    path = Path(path)
+    candidates = [path]
+    if options is not None:
+        formats = options["formats"]
+        candidates += [path.with_suffix(f".{fmt}") for fmt in formats]
+        candidates += [
+            path.with_name(f"{path.stem}-{size}w.{fmt}")
+            for size in sorted(options["sizes"])
+            for fmt in formats
+        ]
+    return [(str(p), p.stat().st_size) for p in dict.fromkeys(candidates) if p.exists()]
+
+
+def adopt_outputs(lock, manifests, only=None, encode=True, backend="genai", root=None):
+    """Registra en el lock las salidas que ya existen, sin llamar a la API.
+
+    Devuelve (salidas registradas, problemas: las que faltan o no son válidas).
+    """
+    adopted = []
+    problems = []
+
+    def visit(img):
+        output = img["output"]
+        path = str(Path(root) / output) if root else output
+        options = encode_options(img) if encode else None
+        files = existing_files(path, options)
+        if not files or files[0][0] != path:
+            problems.append(f"{path}: no existe")
+            return
+        invalid = [verify_file(*entry) for entry in files]
+        if any(invalid):
+            problems.extend(problem for problem in invalid if problem)
+            return
+        encoding = output_encoding(img, encode)
+        if encode:
+            planned = planned_files(path, options) if encoding_available() else []
+            if not planned or not all(Path(p).exists() for p in planned):
+                # Faltan formatos o variantes: el próximo run la recodifica
+                encoding = ADOPTED
+        lock.record(output, img["id"], image_key(img, backend), encoding, files)
+        adopted.append(output)
+
+    for manifest in manifests:
+        problems.extend(scan([manifest], only=only, visit=visit).errors)
+    return adopted, problems
+
+
+def update_lock(lock, digests, encode=True, backend="genai"):
+    """Registra los manifiestos cuyas salidas están todas al día y guarda"""
+    for manifest, digest in digests.items():
+        outputs, problems = stale_outputs(
+            lock, manifest, encode=encode, backend=backend
+        )
+        lock.record_manifest(manifest, digest, encode, None if problems else outputs)
+    lock.save()
+
+
+class RunContext:
+    """Estado compartido por todas las imágenes de una ejecución"""
+
+    def __init__(
+        self,
+        backend,
+        cache,
+        pool=None,
+        rpm=0,
+        force=False,
+        candidates=1,
+        archive_dir=DEFAULT_ARCHIVE_DIR,
+        retry=None,
+        journal=None,
+        profiler=None,
+        lock=None,
+        output_root=None,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.pool = pool
+        self.limiter = RateLimiter(rpm)
+        self.force = force
+        self.candidates = candidates
+        self.archive_dir = Path(archive_dir)
+        self.retry = retry or RetryPolicy()
+        self.journal = journal
+        self.profiler = profiler or Profiler()
+        self.lock = lock
+        self.output_root = Path(output_root) if output_root else None
+
+
+def archive_candidates(archive_dir, img_id, key, candidates, best, scores):
+    """Guarda las candidatas descartadas y sus puntuaciones para revisarlas"""
+    target = Path(archive_dir) / img_id
+    target.mkdir(parents=True, exist_ok=True)
+    for i, image_bytes in enumerate(candidates):
+        if i != best:
+            (target / f"{key[:12]}-{i}.png").write_bytes(image_bytes)
+    with open(target / f"{key[:12]}-scores.json", "w") as f:
+        json.dump({"winner": best, "scores": scores}, f, indent=2)
+
+
+def pick_candidate(ctx, img_id, key, aspect_ratio, images, stats, log):
+    """Elige la mejor de las candidatas devueltas y archiva el resto.
+
+    Un fallo al puntuar o archivar no debe tirar la ejecución (las demás
+    peticiones ya están pagadas): se usa la primera candidata.
+    """
+    candidates = [image.image_bytes for image in images]
+    start = time.perf_counter()
+    try:
+        best, scores = pick_best(candidates, aspect_ratio)
+    except Exception as e:
+        log(f"   ⚠️  No se pudieron puntuar las candidatas, se usa la 1: {e}")
+        best, scores = 0, []
+    stats["score_time"] = time.perf_counter() - start
+    if scores:
+        log(
+            f"   🏆 Candidata {best + 1}/{len(candidates)} "
+            f"(puntuación {scores[best]['score']:.2f})"
+        )
+        try:
+            archive_candidates(ctx.archive_dir, img_id, key, candidates, best, scores)
+        except OSError as e:
+            log(f"   ⚠️  No se pudieron archivar las candidatas: {e}")
+    return candidates[best]
+
+
+def process_image(ctx, idx, total, img_config):
+    """Genera y guarda una imagen del manifiesto.
+
+    Si la imagen ya está en caché (y no se fuerza la regeneración) se reutiliza
+    sin llamar a la API. Los mensajes se acumulan en el resultado en lugar de
+    imprimirse, para que la salida siga el orden del YAML aunque las imágenes
+    se generen en paralelo.
+    """
+    lines = []
+    log = lines.append
+
+    img_id = img_config.get("id", f"image-{idx}")
+    prompt = img_config.get("prompt", "")
+    output = img_config.get("output", "")
+    # Ruta en disco (el backend fake escribe fuera del árbol público)
+    path = str(ctx.output_root / output) if ctx.output_root else output
+    aspect_ratio = img_config.get("aspect_ratio", "4:3")
+
+    log(f"[{idx}/{total}] Generando: {img_id}")
+    log(f"   📁 Output: {path}")
+
+    key = image_key(img_config, ctx.backend.name)
+    result = {
+        "id": img_id,
+        "output": path,
+        "ok": False,
+        "cached": False,
+        "resumed": False,
+        "current": False,
+        "attempts": 0,
+        "billed_images": 0,
+        "api_latency": 0.0,
+        "throttled": 0.0,
+        "score_time": 0.0,
+        "encode_time": 0.0,
+        "bytes_written": 0,
+        "lines": lines,
+        "elapsed": 0.0,
+    }
+
+    if ctx.journal is not None and ctx.journal.is_done(img_id, key, path):
+        log("   ⏭️  Ya completada en la ejecución anterior\n")
+        result.update(ok=True, resumed=True)
+        return result
+
+    options = encode_options(img_config)
+    encoding = encode_digest(options if ctx.pool is not None else None)
+    if (
+        ctx.lock is not None
+        and not ctx.force
+        and not ctx.lock.problems(output, key, encoding)
+    ):
+        log("   🔒 Al día (sin cambios desde la última generación)\n")
+        result.update(ok=True, current=True)
+        return result
+
+    image_bytes = None if ctx.force else ctx.cache.get(key)
+    cached = image_bytes is not None
+    candidates = img_config.get("candidates", ctx.candidates)
+    adopted = None
+    if not cached and not ctx.force and ctx.lock is not None:
+        adopted = ctx.lock.adopted(output, key)
+
+    start = time.perf_counter()
+    if cached:
+        log("   ♻️  Desde caché")
+    elif adopted is not None:
+        # Salida registrada con --adopt: se recodifica sin volver a pagarla
+        image_bytes = Path(adopted).read_bytes()
+        log("   ♻️  Recodificando la salida adoptada")
+    else:
+        images = request_images(ctx, prompt, aspect_ratio, candidates, result, log=log)
+        if images:
+            image_bytes = pick_candidate(
+                ctx, img_id, key, aspect_ratio, images, result, log
+            )
+            ctx.cache.put(key, image_bytes, id=img_id, output=output, model=MODEL)
+
+    ok = False
+    if image_bytes:
+        # Guardar imagen
+        encode_start = time.perf_counter()
+        written = ctx.profiler.call(
+            save_image, image_bytes, path, log=log, pool=ctx.pool, options=options
+        )
+        result["encode_time"] = time.perf_counter() - encode_start
+        if written:
+            result["bytes_written"] = sum(size for _, size in written)
+            log(f"   ✅ Guardada: {path}\n")
+            ok = True
+            if ctx.journal is not None:
+                ctx.journal.record(img_id, key, path)
+            if ctx.lock is not None:
+                ctx.lock.record(output, img_id, key, encoding, written)
+        else:
+            log("   ❌ Error guardando\n")
+    else:
+        log("   ❌ Error generando\n")
+
+    # La espera del limitador no cuenta como tiempo de trabajo
+    elapsed = time.perf_counter() - start - result["throttled"]
+    result.update(ok=ok, cached=cached, elapsed=elapsed)
+    return result
+
+
+def run_images(ctx, entries, total, concurrency=1):
+    """Procesa las entradas con hasta `concurrency` peticiones simultáneas.
+
+    `entries` se consume bajo demanda: solo hay unas pocas entradas en vuelo
+    por hilo, así que la generación empieza con la primera entrada leída y la
+    memoria no depende del tamaño del manifiesto. Todas las peticiones
+    comparten el mismo contexto (backend, limitador, caché y pool de
+    codificación); los resultados se imprimen en el orden del manifiesto.
+    """
+    workers = max(1, concurrency)
+    results = []
+    in_flight = deque()
+
+    def emit(future):
+        result = future.result()
+        print("\n".join(result.pop("lines")))
+        results.append(result)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for idx, img_config in enumerate(entries, 1):
+                in_flight.append(
+                    executor.submit(process_image, ctx, idx, total, img_config)
+                )
+                if len(in_flight) >= workers * 2:
+                    emit(in_flight.popleft())
+            while in_flight:
+                emit(in_flight.popleft())
+        except BaseException:
+            # Ctrl+C o error inesperado: no lanzar más peticiones de pago
+            for future in in_flight:
+                future.cancel()
+            raise
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera imágenes para la landing con Imagen 4.0"
+    )
+    parser.add_argument(
+        "manifests",
+        nargs="+",
+        metavar="prompts.yaml",
+        help="Manifiestos YAML con la lista `images` (admite globs, p. ej. '*.yaml')",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Peticiones simultáneas a la API (por defecto: 1, secuencial)",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=10,
+        help="Máximo de peticiones por minuto, 0 = sin límite (por defecto: 10)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignora la caché y regenera (y vuelve a pagar) cada imagen",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="ID",
+        help="Procesa solo la imagen con este id (repetible)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Directorio de la caché de generación (una por backend)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=500,
+        help="Tamaño máximo de la caché antes de expulsar por LRU (por defecto: 500)",
+    )
+    parser.add_argument(
+        "--no-encode",
+        action="store_true",
+        help="Escribe los bytes devueltos por la API sin recodificar",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Procesos para la codificación WebP/AVIF (por defecto: núcleos)",
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=1,
+        choices=range(1, MAX_CANDIDATES + 1),
+        metavar="N",
+        help="Candidatas por prompt; se queda la mejor puntuada (1-4, por defecto: 1)",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        help="Dónde archivar las candidatas descartadas",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=4,
+        help="Reintentos ante errores transitorios: cuota, timeouts, 5xx (por defecto: 4)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Salta las imágenes ya completadas según el diario de la última ejecución",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="Diario JSONL de imágenes completadas",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        metavar="PATH",
+        help="Escribe un informe JSON con tiempos, percentiles, coste y caché",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="PATH",
+        help="Perfila generate_image/save_image con cProfile y guarda el .prof",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("genai", "fake"),
+        default="genai",
+        help="genai: Imagen 4.0 real; fake: backend local sin coste (benchmarks)",
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=float,
+        default=1.0,
+        help="Latencia simulada por llamada del backend fake, en segundos",
+    )
+    parser.add_argument(
+        "--fake-error-rate",
+        type=float,
+        default=0.0,
+        help="Proporción de llamadas del backend fake que fallan (429/503)",
+    )
+    parser.add_argument(
+        "--fake-payload-kb",
+        type=int,
+        default=1500,
+        help="Tamaño aproximado de cada PNG del backend fake",
+    )
+    parser.add_argument("--fake-seed", type=int, help="Semilla del backend fake")
+    lock_mode = parser.add_mutually_exclusive_group()
+    lock_mode.add_argument(
+        "--check",
+        action="store_true",
+        help="Solo comprueba que cada salida existe y está al día; sale con 1 si no",
+    )
+    lock_mode.add_argument(
+        "--adopt",
+        action="store_true",
+        help="Registra en el lock las salidas que ya existen, tal cual, sin "
+        "llamar a la API (para empezar a usar --check con assets previos)",
+    )
+    parser.add_argument(
+        "--lock",
+        type=Path,
+        help="Registro de salidas generadas que usa --check",
+    )
+    parser.add_argument(
+        "--output-root",
+        type=Path,
+        help="Directorio bajo el que se escriben los `output` "
+        "(por defecto: el actual; con --backend fake, .cache/fake/outputs)",
+    )
+    args = parser.parse_args(argv)
+    for name, default in BACKEND_PATHS[args.backend].items():
+        if getattr(args, name) is None:
+            setattr(args, name, default)
+    return args
+
+
+def create_backend(args):
+    """Construye el backend elegido; sale con error si falta algo"""
+    if args.backend == "fake":
+        return FakeBackend(
+            latency=args.fake_latency,
+            jitter=args.fake_latency * 0.2,
+            error_rate=args.fake_error_rate,
+            payload_kb=args.fake_payload_kb,
+            seed=args.fake_seed,
+        )
+
+    # Cargar variables de entorno (solo hacen falta para la API real)
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+
     # Verificar API key
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -68,66 +686,257 @@ def main():
         print("💡 Crea un archivo .env con: GEMINI_API_KEY=tu-api-key")
         sys.exit(1)
 
-    # Verificar argumentos
-    if len(sys.argv) < 2:
-        print("Uso: python generate_benefits_images.py <prompts.yaml>")
+    try:
+        return GenaiBackend(api_key, MODEL, SAFETY_FILTER_LEVEL)
+    except ImportError:
+        print("❌ Error: google-genai no está instalado")
+        print("💡 Ejecuta: pip install google-genai")
         sys.exit(1)
 
-    prompts_file = sys.argv[1]
 
-    # Cargar prompts
+def run_check(args):
+    """Valida las salidas contra el lock sin importar nada pesado"""
+    start = time.perf_counter()
     try:
-        with open(prompts_file, "r") as f:
-            data = yaml.safe_load(f)
-    except Exception as e:
+        manifests = expand(args.manifests)
+    except ManifestError as e:
+        print(f"❌ Error cargando prompts: {e}")
+        sys.exit(1)
+
+    lock = OutputLock(args.lock)
+    problems = check_outputs(
+        lock,
+        manifests,
+        only=set(args.only or []),
+        encode=not args.no_encode,
+        backend=args.backend,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if problems:
+        print(f"❌ Salidas pendientes de regenerar ({len(problems)}):")
+        for problem in problems:
+            print(f"   - {problem}")
+        print("💡 Ejecuta el generador sin --check para actualizarlas")
+        sys.exit(1)
+    print(f"✅ Todas las salidas están al día ({elapsed:.0f} ms)")
+    adopted = lock.adopted_count()
+    if adopted:
+        print(f"ℹ️  {adopted} adoptadas sin todas sus variantes: se recodifican")
+        print("   en la próxima ejecución del generador (sin llamar a la API)")
+
+
+def run_adopt(args):
+    """Da por buenas las salidas existentes y las registra en el lock"""
+    try:
+        manifests = expand(args.manifests)
+    except ManifestError as e:
+        print(f"❌ Error cargando prompts: {e}")
+        sys.exit(1)
+
+    lock = OutputLock(args.lock)
+    encode = not args.no_encode
+    adopted, problems = adopt_outputs(
+        lock,
+        manifests,
+        only=set(args.only or []),
+        encode=encode,
+        backend=args.backend,
+        root=args.output_root,
+    )
+    digests = {manifest: file_digest(manifest) for manifest in manifests}
+    update_lock(lock, digests, encode=encode, backend=args.backend)
+    print(f"🔒 Registradas {len(adopted)} salidas existentes en {args.lock}")
+    if problems:
+        print(f"❌ Sin registrar ({len(problems)}):")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+
+
+def main():
+    args = parse_args()
+
+    if args.check:
+        run_check(args)
+        return
+    if args.adopt:
+        run_adopt(args)
+        return
+
+    # Validar todos los manifiestos antes de gastar nada
+    try:
+        manifests = expand(args.manifests)
+    except ManifestError as e:
         print(f"❌ Error cargando prompts: {e}")
         sys.exit(1)
 
-    images = data.get("images", [])
-    if not images:
+    only = set(args.only or [])
+    encode = not args.no_encode
+    digests = {manifest: file_digest(manifest) for manifest in manifests}
+    lock = OutputLock(args.lock)
+    cache = GenerationCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    estimate = {"work": 0, "pending": 0, "billed": 0, "multi": args.candidates > 1}
+
+    def visit(img):
+        candidates = img.get("candidates", args.candidates)
+        key = image_key(img, args.backend)
+        if not args.force and not lock.problems(
+            img["output"], key, output_encoding(img, encode)
+        ):
+            return
+        estimate["work"] += 1
+        if not args.force and (key in cache or lock.adopted(img["output"], key)):
+            return
+        estimate["multi"] = estimate["multi"] or candidates > 1
+        estimate["pending"] += 1
+        estimate["billed"] += candidates
+
+    plan = scan(manifests, only=only, visit=visit)
+    if plan.errors:
+        print(f"❌ Manifiestos inválidos ({len(plan.errors)} errores):")
+        for error in plan.errors:
+            print(f"   - {error}")
+        sys.exit(1)
+
+    unknown = only - plan.ids
+    if unknown:
+        print(f"❌ Ids no encontrados en el YAML: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+    if not plan.total:
         print("❌ No se encontraron imágenes en el archivo YAML")
         sys.exit(1)
 
-    print(f"🎨 Generando {len(images)} imágenes para Benefits section...")
-    print(f"💰 Costo estimado: ~${len(images) * 0.04:.2f} USD\n")
+    # Pillow (y sus plugins) solo se cargan si hay algo que codificar
+    if encode and estimate["work"] and not encoding_available():
+        print("❌ Error: Pillow no está instalado (necesario para codificar WebP/AVIF)")
+        print("💡 Ejecuta: pip install pillow pillow-avif-plugin, o usa --no-encode")
+        sys.exit(1)
+    if encode and estimate["work"] and not avif_available():
+        print("⚠️  Pillow sin soporte AVIF: solo se generarán PNG/WebP")
+        print("💡 Ejecuta: pip install pillow-avif-plugin")
+    if estimate["multi"] and not scoring_available():
+        print("❌ Error: numpy y Pillow son necesarios para puntuar candidatas")
+        print("💡 Ejecuta: pip install numpy pillow")
+        sys.exit(1)
 
-    # Inicializar cliente
-    client = genai.Client(api_key=api_key)
+    # El backend fake no factura nada
+    price = 0.0 if args.backend == "fake" else COST_PER_IMAGE
 
-    # Generar cada imagen
-    generated = []
-    failed = []
+    print(f"🎨 Generando {plan.total} imágenes de {len(manifests)} manifiesto(s)...")
+    if plan.duplicates:
+        print(f"🔁 Duplicadas ignoradas: {plan.duplicates}")
+    print(
+        f"💰 Costo estimado: ~${estimate['billed'] * price:.2f} USD "
+        f"({plan.total - estimate['pending']} en caché o al día)"
+    )
+    print(f"⚡ Concurrencia: {args.concurrency} · Límite: {args.rpm or '∞'} rpm\n")
 
-    for idx, img_config in enumerate(images, 1):
-        img_id = img_config.get("id", f"image-{idx}")
-        prompt = img_config.get("prompt", "")
-        output = img_config.get("output", "")
-        aspect_ratio = img_config.get("aspect_ratio", "4:3")
+    # Inicializar backend (un único cliente compartido entre todos los hilos).
+    # Si todo está en caché o al día no se crea hasta que haga falta.
+    if estimate["pending"]:
+        backend = create_backend(args)
+    else:
+        backend = LazyBackend(args.backend, lambda: create_backend(args))
 
-        print(f"[{idx}/{len(images)}] Generando: {img_id}")
-        print(f"   📁 Output: {output}")
+    # Generar imágenes
+    wall_start = time.perf_counter()
+    pool = None
+    if encode:
+        pool = encode_pool(args.encode_workers)
+    journal = RunJournal(args.journal, resume=args.resume)
+    ctx = RunContext(
+        backend,
+        cache,
+        pool,
+        rpm=args.rpm,
+        force=args.force,
+        candidates=args.candidates,
+        archive_dir=args.archive_dir,
+        retry=RetryPolicy(max_retries=args.max_retries),
+        journal=journal,
+        profiler=Profiler(enabled=args.profile is not None),
+        lock=lock,
+        output_root=args.output_root,
+    )
+    try:
+        entries = stream(manifests, only=only)
+        results = run_images(ctx, entries, plan.total, args.concurrency)
+    finally:
+        journal.close()
+        if pool is not None:
+            pool.shutdown()
+        cache.evict()
+        cache.save()
+        update_lock(lock, digests, encode=encode, backend=args.backend)
+    wall_time = time.perf_counter() - wall_start
 
-        # Generar imagen
-        image_data = generate_image(client, prompt, aspect_ratio)
+    settings = {
+        "manifests": [str(path) for path in manifests],
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "rpm": args.rpm,
+        "candidates": args.candidates,
+        "encode": encode,
+        "encode_workers": args.encode_workers,
+        "force": args.force,
+        "resume": args.resume,
+    }
+    report = build_report(
+        results,
+        wall_time,
+        settings,
+        estimated_cost=estimate["billed"] * price,
+        price_per_image=price,
+    )
+    aggregate = report["aggregate"]
 
-        if image_data:
-            # Guardar imagen
-            if save_image(image_data, output):
-                print(f"   ✅ Guardada: {output}\n")
-                generated.append(output)
-            else:
-                print(f"   ❌ Error guardando\n")
-                failed.append(img_id)
-        else:
-            print(f"   ❌ Error generando\n")
-            failed.append(img_id)
+    generated = [
+        r["output"]
+        for r in results
+        if r["ok"] and not r["current"] and not r["resumed"]
+    ]
+    # Las reanudadas y las que ya estaban al día no cuentan como trabajo
+    skipped = aggregate["resumed"] + aggregate["up_to_date"]
+    failed = [r["id"] for r in results if not r["ok"]]
 
     # Resumen
     print("\n" + "=" * 50)
     print("📊 RESUMEN")
     print("=" * 50)
-    print(f"✅ Generadas: {len(generated)}/{len(images)}")
+    print(f"✅ Generadas: {len(generated)}/{plan.total - skipped}")
     print(f"❌ Fallidas: {len(failed)}")
+    print(
+        f"♻️  Desde caché: {aggregate['cache_hits']} · "
+        f"Peticiones a la API: {aggregate['requests']}"
+    )
+    if aggregate["resumed"]:
+        print(f"⏭️  Reanudadas: {aggregate['resumed']}")
+    if aggregate["up_to_date"]:
+        print(f"🔒 Al día (sin cambios): {aggregate['up_to_date']}")
+    print(
+        f"⏱️  Tiempo: {wall_time:.1f}s "
+        f"(suma por imagen: {report['serial_upper_bound_s']:.1f}s, "
+        "cota superior del secuencial)"
+    )
+    if aggregate["api_latency_s"]:
+        latency = aggregate["api_latency_s"]
+        print(
+            f"📈 Latencia API: p50 {latency['p50']:.1f}s · "
+            f"p90 {latency['p90']:.1f}s · máx {latency['max']:.1f}s"
+        )
+    print(
+        f"💰 Coste real: ${report['cost']['actual_usd']:.2f} USD "
+        f"(estimado: ${report['cost']['estimated_usd']:.2f})"
+    )
+
+    if args.report:
+        write_report(args.report, report)
+        print(f"🧾 Informe: {args.report}")
+    if args.profile:
+        if ctx.profiler.dump(args.profile):
+            print(f"🔬 Perfil: {args.profile} (python -m pstats {args.profile})")
+        else:
+            print("⚠️  Sin datos de perfil (ninguna llamada perfilada)")
 
     if generated:
         print("\n📁 Imágenes generadas:")
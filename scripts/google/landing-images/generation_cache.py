@@ -0,0 +1,115 @@
+"""
+Caché local de imágenes generadas, direccionada por contenido.
+
+Cada entrada se identifica por el hash de (modelo, prompt, aspect_ratio,
+safety_filter_level): si ninguno cambia, la imagen ya pagada se reutiliza
+en lugar de volver a llamar a la API. Los bytes se guardan en `objects/` y
+un manifiesto JSON lateral registra tamaño, origen y último uso de cada
+entrada para poder expulsar por LRU cuando la caché supera su tamaño máximo.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+
+
+def cache_key(model, prompt, aspect_ratio, safety_filter_level):
+    """Hash estable de los parámetros que determinan la imagen generada"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "prompt": prompt.strip(),
+            "aspect_ratio": aspect_ratio,
+            "safety_filter_level": safety_filter_level,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Caché en disco con expulsión LRU por tamaño total"""
+
+    def __init__(self, root, max_bytes=500 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.manifest_path = self.root / MANIFEST_NAME
+        self.lock = threading.Lock()
+        self.entries = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _blob_path(self, key):
+        return self.root / "objects" / key[:2] / f"{key}.bin"
+
+    def __contains__(self, key):
+        return key in self.entries and self._blob_path(key).exists()
+
+    @property
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def get(self, key):
+        """Devuelve los bytes cacheados o None si no hay entrada válida"""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            try:
+                data = self._blob_path(key).read_bytes()
+            except OSError:
+                # El blob desapareció: la entrada ya no sirve
+                del self.entries[key]
+                return None
+            self.entries[key]["last_used"] = time.time()
+            return data
+
+    def put(self, key, data, **meta):
+        """Guarda `data` bajo `key`; `meta` se añade al manifiesto"""
+        blob = self._blob_path(key)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_suffix(f".tmp{threading.get_ident()}")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+
+        now = time.time()
+        with self.lock:
+            self.entries[key] = {
+                **meta,
+                "size": len(data),
+                "created": now,
+                "last_used": now,
+            }
+
+    def evict(self):
+        """Expulsa las entradas menos usadas hasta caber en `max_bytes`"""
+        evicted = []
+        with self.lock:
+            total = self.total_bytes
+            by_age = sorted(self.entries, key=lambda k: self.entries[k]["last_used"])
+            for key in by_age:
+                if total <= self.max_bytes:
+                    break
+                total -= self.entries.pop(key)["size"]
+                self._blob_path(key).unlink(missing_ok=True)
+                evicted.append(key)
+        return evicted
+
+    def save(self):
+        """Persiste el manifiesto de forma atómica"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            payload = {"version": 1, "entries": self.entries}
+            tmp = self.manifest_path.with_suffix(".json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(payload, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
@@ -0,0 +1,180 @@
+"""
+Codificación de las imágenes generadas a WebP/AVIF con variantes responsive.
+
+Imagen devuelve PNG/JPEG; aquí se decodifica el resultado y se emite el
+formato que indica la extensión de `output`, los formatos adicionales
+configurados y una variante por cada ancho de `deviceSizes` menor que el
+original. Cada variante es un trabajo independiente para que un
+ProcessPoolExecutor reparta la codificación entre todos los núcleos.
+"""
+
+import io
+import os
+import importlib.util
+from pathlib import Path
+
+# Sincronizado con images.deviceSizes en next.config.ts
+DEVICE_SIZES = (640, 750, 828, 1080, 1200, 1920)
+
+DEFAULT_ENCODE = {
+    "formats": ["webp", "avif"],
+    "quality": 82,
+    "avif_quality": 60,
+    "effort": 4,
+    "sizes": list(DEVICE_SIZES),
+}
+
+FORMATS = {
+    ".png": "png",
+    ".jpg": "jpeg",
+    ".jpeg": "jpeg",
+    ".webp": "webp",
+    ".avif": "avif",
+}
+
+PIL_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP", "avif": "AVIF"}
+
+
+def _pillow():
+    """Importa Pillow bajo demanda (es lo más caro de cargar del script)"""
+    from PIL import Image
+
+    try:
+        # Registra AVIF en versiones de Pillow sin soporte nativo (< 11.2)
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    return Image
+
+
+def encoding_available():
+    return importlib.util.find_spec("PIL") is not None
+
+
+def avif_available():
+    if not encoding_available():
+        return False
+    from PIL import features
+
+    Image = _pillow()
+    Image.init()
+    return bool(features.check("avif")) or "AVIF" in Image.SAVE
+
+
+def encode_options(img_config):
+    """Combina las opciones `encode` de una entrada con los valores por defecto"""
+    options = dict(DEFAULT_ENCODE)
+    options.update(img_config.get("encode") or {})
+    return options
+
+
+def plan_outputs(output, width, options):
+    """Lista de (ruta, formato, ancho) a generar para `output`.
+
+    `ancho` es None para las copias a tamaño completo. Las variantes solo se
+    emiten en los formatos de `formats`, siguen el patrón
+    `<nombre>-<ancho>w.<ext>` y solo se crean para anchos menores que el
+    original (nunca se amplía).
+    """
+    output = Path(output)
+    primary = FORMATS.get(output.suffix.lower())
+    if primary is None:
+        raise ValueError(f"Extensión no soportada: {output.suffix}")
+
+    formats = [fmt for fmt in options["formats"] if fmt != "avif" or avif_available()]
+    planned = [(output, primary, None)]
+    for fmt in formats:
+        if fmt != primary:
+            planned.append((output.with_suffix(f".{fmt}"), fmt, None))
+    for size in sorted(options["sizes"]):
+        if size >= width:
+            continue
+        for fmt in formats:
+            variant = output.with_name(f"{output.stem}-{size}w.{fmt}")
+            planned.append((variant, fmt, size))
+    return planned
+
+
+def planned_files(output, options):
+    """Rutas que `encode_image` escribiría para un `output` que ya existe"""
+    with _pillow().open(output) as img:
+        width = img.width  # solo lee la cabecera
+    return [path for path, _, _ in plan_outputs(output, width, options)]
+
+
+def _save_kwargs(fmt, options):
+    effort = int(options["effort"])
+    if fmt == "webp":
+        return {"quality": options["quality"], "method": min(6, effort)}
+    if fmt == "avif":
+        # speed: 0 (lento, mejor) .. 10 (rápido); effort crece en sentido opuesto
+        return {"quality": options["avif_quality"], "speed": max(0, 10 - effort)}
+    if fmt == "jpeg":
+        return {"quality": options["quality"], "optimize": True, "progressive": True}
+    return {"optimize": True}
+
+
+def encode_bytes(image_bytes, fmt, width, options):
+    """Decodifica `image_bytes` y lo recodifica en `fmt`, redimensionando a
+    `width` si se indica. Devuelve los bytes codificados."""
+    Image = _pillow()
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        if fmt == "jpeg" or img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGB" if fmt == "jpeg" else "RGBA")
+        if width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, PIL_FORMATS[fmt], **_save_kwargs(fmt, options))
+    return buffer.getvalue()
+
+
+def write_atomic(path, data):
+    """Escribe `data` en `path` vía fichero temporal + rename"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def encode_one(image_bytes, path, fmt, width, options):
+    """Codifica y escribe una variante.
+
+    Se ejecuta en un proceso del pool; devuelve (ruta, bytes escritos).
+    """
+    data = encode_bytes(image_bytes, fmt, width, options)
+    write_atomic(path, data)
+    return str(path), len(data)
+
+
+def encode_pool(workers=None):
+    """Pool de procesos para `encode_image` que se puede usar desde hilos.
+
+    Con `fork` los procesos se crearían en el primer `submit`, desde un hilo
+    del generador y con locks de otros hilos tomados (riesgo de deadlock):
+    se usa `forkserver` (o `spawn` donde no existe).
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+
+
+def encode_image(pool, image_bytes, output, options):
+    """Codifica `image_bytes` en todas las salidas planificadas usando `pool`.
+
+    Devuelve la lista de (ruta, bytes escritos) en el orden planificado.
+    """
+    with _pillow().open(io.BytesIO(image_bytes)) as img:
+        width = img.width  # solo lee la cabecera
+
+    futures = [
+        pool.submit(encode_one, image_bytes, str(path), fmt, size, options)
+        for path, fmt, size in plan_outputs(output, width, options)
+    ]
+    return [future.result() for future in futures]
@@ -0,0 +1,120 @@
+"""
+Puntuación local de candidatas para quedarse con la mejor imagen.
+
+Imagen puede devolver hasta 4 imágenes por petición; en lugar de repetir la
+llamada cuando sale un render malo, se piden varias y se elige aquí con
+métricas baratas calculadas sobre una miniatura, todas las candidatas a la
+vez en un único array NumPy:
+
+- nitidez: varianza del laplaciano (relativa a la mejor del lote)
+- color de marca: proporción de píxeles cercanos al azul StudioTek #2563EB
+- geometría: proporción y ancho mínimo respecto a lo pedido
+"""
+
+import io
+import importlib.util
+
+BRAND_BLUE = (0x25, 0x63, 0xEB)
+# Distancia RGB máxima (normalizada 0-1) para contar un píxel como "azul marca"
+BRAND_TOLERANCE = 0.25
+# Cobertura de azul a partir de la cual la métrica de marca satura
+BRAND_TARGET_COVERAGE = 0.15
+MIN_WIDTH = 1024
+THUMB_WIDTH = 512
+
+WEIGHTS = {"sharpness": 0.5, "brand": 0.3, "geometry": 0.2}
+
+
+def scoring_available():
+    return all(importlib.util.find_spec(name) for name in ("numpy", "PIL"))
+
+
+def _aspect(aspect_ratio):
+    width, height = aspect_ratio.split(":")
+    return int(width) / int(height)
+
+
+def _load(np, candidates):
+    """Decodifica las candidatas a un array (N, H, W, 3) de miniaturas"""
+    from PIL import Image
+
+    sizes = []
+    thumbs = []
+    thumb_size = None
+    for image_bytes in candidates:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            sizes.append(img.size)
+            if thumb_size is None:
+                thumb_size = (THUMB_WIDTH, round(img.height * THUMB_WIDTH / img.width))
+            thumb = img.convert("RGB").resize(thumb_size, Image.BILINEAR)
+            thumbs.append(np.asarray(thumb, dtype=np.float32))
+    return np.stack(thumbs), np.array(sizes, dtype=np.float32)
+
+
+def sharpness(np, rgb):
+    """Varianza del laplaciano de 4 vecinos por candidata"""
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    lap = (
+        gray[:, :-2, 1:-1]
+        + gray[:, 2:, 1:-1]
+        + gray[:, 1:-1, :-2]
+        + gray[:, 1:-1, 2:]
+        - 4 * gray[:, 1:-1, 1:-1]
+    )
+    return lap.reshape(len(rgb), -1).var(axis=1)
+
+
+def brand_coverage(np, rgb):
+    """Proporción de píxeles a menos de BRAND_TOLERANCE del azul de marca"""
+    blue = np.array(BRAND_BLUE, dtype=np.float32)
+    distance = np.linalg.norm(rgb - blue, axis=-1) / np.sqrt(3 * 255.0**2)
+    return (distance < BRAND_TOLERANCE).reshape(len(rgb), -1).mean(axis=1)
+
+
+def geometry(np, sizes, aspect_ratio):
+    """1.0 si proporción y ancho cuadran; penaliza desviaciones"""
+    target = _aspect(aspect_ratio)
+    error = np.abs(sizes[:, 0] / sizes[:, 1] - target) / target
+    aspect_score = np.clip(1 - error / 0.05, 0, 1)
+    width_score = np.clip(sizes[:, 0] / MIN_WIDTH, 0, 1)
+    return aspect_score * width_score
+
+
+def score_candidates(candidates, aspect_ratio):
+    """Puntúa una lista de imágenes (bytes). Devuelve una lista de dicts.
+
+    NumPy se importa solo aquí (tarda ~100 ms) y se pasa a las métricas.
+    """
+    import numpy as np
+
+    rgb, sizes = _load(np, candidates)
+    sharp = sharpness(np, rgb)
+    brand = brand_coverage(np, rgb)
+    geo = geometry(np, sizes, aspect_ratio)
+
+    metrics = {
+        "sharpness": sharp / sharp.max() if sharp.max() > 0 else np.zeros_like(sharp),
+        "brand": np.clip(brand / BRAND_TARGET_COVERAGE, 0, 1),
+        "geometry": geo,
+    }
+    total = sum(WEIGHTS[name] * values for name, values in metrics.items())
+
+    return [
+        {
+            "score": round(float(total[i]), 4),
+            "sharpness": round(float(sharp[i]), 2),
+            "brand_coverage": round(float(brand[i]), 4),
+            "geometry": round(float(geo[i]), 4),
+            "size": [int(sizes[i, 0]), int(sizes[i, 1])],
+        }
+        for i in range(len(candidates))
+    ]
+
+
+def pick_best(candidates, aspect_ratio):
+    """Devuelve (índice de la ganadora, puntuaciones de todas)"""
+    if len(candidates) == 1:
+        return 0, []
+    scores = score_candidates(candidates, aspect_ratio)
+    best = max(range(len(scores)), key=lambda i: scores[i]["score"])
+    return best, scores
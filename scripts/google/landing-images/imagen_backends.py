@@ -0,0 +1,168 @@
+"""
+Backends de generación de imágenes.
+
+El generador solo necesita `backend.name` (separa cachés y salidas por
+backend) y `backend.generate(prompt, aspect_ratio, n)`, que devuelve una
+lista de objetos con `image_bytes` (o None si los filtros de seguridad
+bloquean el prompt) y lanza excepción ante errores de la API.
+
+- GenaiBackend: Imagen 4.0 real vía google-genai.
+- FakeBackend: local y gratuito, con latencia, tasa de error y tamaño de
+  imagen configurables; para benchmarks y pruebas sin red.
+- LazyBackend: crea el backend real en la primera llamada, para que una
+  ejecución sin nada pendiente no importe el SDK ni cree el cliente.
+"""
+
+import time
+import zlib
+import random
+import struct
+import hashlib
+import threading
+
+
+class GeneratedImage:
+    """Imagen devuelta por un backend (misma forma que `types.Image`)"""
+
+    __slots__ = ("image_bytes",)
+
+    def __init__(self, image_bytes):
+        self.image_bytes = image_bytes
+
+
+class GenaiBackend:
+    """Imagen 4.0 a través de google-genai. Un único cliente compartido."""
+
+    name = "genai"
+
+    def __init__(self, api_key, model, safety_filter_level):
+        from google import genai
+        from google.genai import types
+
+        self.client = genai.Client(api_key=api_key)
+        self.types = types
+        self.model = model
+        self.safety_filter_level = safety_filter_level
+
+    def generate(self, prompt, aspect_ratio, number_of_images):
+        response = self.client.models.generate_images(
+            model=self.model,
+            prompt=prompt,
+            config=self.types.GenerateImagesConfig(
+                number_of_images=number_of_images,
+                aspect_ratio=aspect_ratio,
+                safety_filter_level=self.safety_filter_level,
+            ),
+        )
+        if response.generated_images and len(response.generated_images) > 0:
+            return [generated.image for generated in response.generated_images]
+        return None
+
+
+class FakeAPIError(Exception):
+    """Error simulado con `code` HTTP, como `google.genai.errors.APIError`"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.details = None
+
+
+# Tamaños de salida de Imagen 4.0 por proporción
+IMAGE_SIZES = {
+    "1:1": (1024, 1024),
+    "3:4": (896, 1280),
+    "4:3": (1280, 896),
+    "9:16": (768, 1408),
+    "16:9": (1408, 768),
+}
+
+
+def _png(width, height, rows, rng, payload_bytes):
+    """PNG RGB sintético de ~`payload_bytes`: degradado azul + banda de ruido.
+
+    El degradado comprime casi a cero; las filas de ruido no comprimen, así
+    que su número fija el tamaño final sin depender de Pillow.
+    """
+    noise_rows = min(height, payload_bytes // (width * 3 + 1))
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)  # filtro "None"
+        if y < noise_rows:
+            raw += rng.randbytes(width * 3)
+        else:
+            shade = rows[y]
+            raw += bytes((0x25 * shade // 255, 0x63 * shade // 255, 0xEB)) * width
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(bytes(raw), 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FakeBackend:
+    """Backend local para benchmarks: no hace red ni cuesta dinero.
+
+    `latency` ± `jitter` simula la latencia de la API, `error_rate` la
+    proporción de llamadas que fallan con un error transitorio (503/429) y
+    `payload_kb` el tamaño aproximado de cada PNG devuelto. Con `seed` las
+    imágenes y los errores son reproducibles.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self, latency=1.0, jitter=0.0, error_rate=0.0, payload_kb=1500, seed=None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payload_bytes = payload_kb * 1024
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt, aspect_ratio, number_of_images):
+        with self.lock:
+            self.calls += 1
+            delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+            failure = self.rng.random() < self.error_rate
+            code = self.rng.choice((429, 503))
+        time.sleep(max(0.0, delay))
+        if failure:
+            raise FakeAPIError(code, "simulated transient error")
+
+        width, height = IMAGE_SIZES[aspect_ratio]
+        rows = [64 + 191 * y // max(1, height - 1) for y in range(height)]
+        images = []
+        for i in range(number_of_images):
+            digest = hashlib.sha256(f"{self.seed}:{prompt}:{i}".encode()).digest()
+            rng = random.Random(digest)
+            images.append(
+                GeneratedImage(_png(width, height, rows, rng, self.payload_bytes))
+            )
+        return images
+
+
+class LazyBackend:
+    """Construye el backend con `factory()` en la primera llamada a generate"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.backend = None
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, aspect_ratio, number_of_images):
+        with self.lock:
+            if self.backend is None:
+                self.backend = self.factory()
+        return self.backend.generate(prompt, aspect_ratio, number_of_images)
@@ -0,0 +1,219 @@
+"""
+Lectura y validación de manifiestos YAML de imágenes.
+
+Se aceptan varios ficheros (o globs) por ejecución. Las entradas de la lista
+`images` se leen de una en una a partir de los eventos del parser YAML, sin
+cargar el documento entero, así que la generación puede empezar en cuanto se
+lee la primera entrada y la memoria no crece con el tamaño del manifiesto.
+
+El flujo tiene dos pasadas baratas sobre los ficheros:
+1. `scan()` valida el esquema y detecta duplicados antes de cualquier
+   llamada de pago.
+2. `stream()` vuelve a leerlos y entrega las entradas ya deduplicadas.
+"""
+
+import re
+import glob
+import json
+import hashlib
+from pathlib import Path
+
+from image_encoding import FORMATS
+
+ASPECT_RATIOS = {"1:1", "3:4", "4:3", "9:16", "16:9"}
+MAX_CANDIDATES = 4  # límite de number_of_images en Imagen 4.0
+ENCODE_FORMATS = {"webp", "avif"}
+ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+class ManifestError(Exception):
+    pass
+
+
+def expand(patterns):
+    """Resuelve rutas y globs (`**` incluido) en una lista ordenada sin repetidos"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise ManifestError(f"{pattern}: no existe ningún manifiesto")
+        paths.extend(Path(match) for match in matches)
+    return list(dict.fromkeys(paths))
+
+
+def iter_entries(path):
+    """Genera las entradas de `images` de un manifiesto una a una"""
+    import yaml
+    from yaml.events import (
+        MappingEndEvent,
+        MappingStartEvent,
+        SequenceEndEvent,
+        SequenceStartEvent,
+    )
+
+    with open(path, "r") as f:
+        loader = yaml.SafeLoader(f)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(MappingStartEvent):
+                raise ManifestError(f"{path}: la raíz debe ser un mapa con `images`")
+            loader.get_event()
+            while not loader.check_event(MappingEndEvent):
+                key = loader.construct_document(loader.compose_node(None, None))
+                if key != "images":
+                    loader.compose_node(None, None)  # se descarta el valor
+                    continue
+                if not loader.check_event(SequenceStartEvent):
+                    raise ManifestError(f"{path}: `images` debe ser una lista")
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    node = loader.compose_node(None, None)
+                    yield loader.construct_document(node)
+                loader.get_event()
+        except yaml.YAMLError as e:
+            raise ManifestError(f"{path}: YAML inválido: {e}") from e
+        finally:
+            loader.dispose()
+
+
+def validate(entry):
+    """Lista de errores de esquema de una entrada (vacía si es válida)"""
+    if not isinstance(entry, dict):
+        return ["la entrada debe ser un mapa"]
+
+    errors = []
+    img_id = entry.get("id")
+    if not isinstance(img_id, str) or not ID_PATTERN.match(img_id):
+        errors.append(f"`id` inválido: {img_id!r}")
+    prompt = entry.get("prompt")
+    if not isinstance(prompt, str) or not prompt.strip():
+        errors.append("falta `prompt`")
+    output = entry.get("output")
+    if not isinstance(output, str) or Path(output).suffix.lower() not in FORMATS:
+        errors.append(
+            f"`output` debe terminar en {', '.join(sorted(FORMATS))}: {output!r}"
+        )
+    aspect_ratio = entry.get("aspect_ratio", "4:3")
+    if aspect_ratio not in ASPECT_RATIOS:
+        errors.append(
+            f"`aspect_ratio` debe ser uno de {sorted(ASPECT_RATIOS)}: {aspect_ratio!r}"
+        )
+    candidates = entry.get("candidates", 1)
+    if not isinstance(candidates, int) or not 1 <= candidates <= MAX_CANDIDATES:
+        errors.append(f"`candidates` debe estar entre 1 y {MAX_CANDIDATES}")
+
+    encode = entry.get("encode", {})
+    if not isinstance(encode, dict):
+        errors.append("`encode` debe ser un mapa")
+        return errors
+    unknown = set(encode) - {"formats", "quality", "avif_quality", "effort", "sizes"}
+    if unknown:
+        errors.append(f"`encode` tiene claves desconocidas: {sorted(unknown)}")
+    formats = encode.get("formats", [])
+    if not isinstance(formats, list) or not set(formats) <= ENCODE_FORMATS:
+        errors.append(
+            f"`encode.formats` debe ser una lista de {sorted(ENCODE_FORMATS)}"
+        )
+    ranges = (("quality", 1, 100), ("avif_quality", 1, 100), ("effort", 0, 10))
+    for name, low, high in ranges:
+        value = encode.get(name, low)
+        if not isinstance(value, int) or not low <= value <= high:
+            errors.append(f"`encode.{name}` debe estar entre {low} y {high}")
+    sizes = encode.get("sizes", [])
+    if not isinstance(sizes, list) or not all(
+        isinstance(size, int) and size > 0 for size in sizes
+    ):
+        errors.append("`encode.sizes` debe ser una lista de anchos en píxeles")
+    return errors
+
+
+def _fingerprint(entry):
+    """Hash del contenido de una entrada (no se guarda la entrada completa)"""
+    payload = json.dumps(entry, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Scan:
+    """Resultado de la pasada de validación"""
+
+    def __init__(self):
+        self.total = 0
+        self.errors = []
+        self.duplicates = 0
+        self.ids = set()
+
+
+def scan(paths, only=None, visit=None):
+    """Valida todos los manifiestos sin generar nada.
+
+    Las entradas repetidas (mismo id o misma salida) con contenido idéntico
+    se cuentan como duplicadas y se ignoran; si el contenido difiere es un
+    error. Dos salidas que solo cambian de extensión (`hero.png` y
+    `hero.webp`) también chocan: el encoder escribe `hero.webp`, `hero.avif`
+    y `hero-640w.webp` junto a cualquiera de ellas.
+
+    `visit(entry)` se llama con cada entrada única que se procesará.
+    """
+    result = Scan()
+    by_id = {}
+    by_output = {}
+    by_stem = {}
+    for path in paths:
+        try:
+            for position, entry in enumerate(iter_entries(path), 1):
+                where = f"{path}#{position}"
+                errors = validate(entry)
+                if errors:
+                    result.errors.extend(f"{where}: {error}" for error in errors)
+                    continue
+
+                fingerprint = _fingerprint(entry)
+                stem = Path(entry["output"]).with_suffix("").as_posix()
+                previous = (
+                    by_id.get(entry["id"])
+                    or by_output.get(entry["output"])
+                    or by_stem.get(stem)
+                )
+                if previous is not None:
+                    if previous[1] != fingerprint:
+                        result.errors.append(
+                            f"{where}: `{entry['id']}` choca con {previous[0]} "
+                            "(mismo id, output o nombre de salida con distinto "
+                            "contenido)"
+                        )
+                    else:
+                        result.duplicates += 1
+                    continue
+                by_id[entry["id"]] = (where, fingerprint)
+                by_output[entry["output"]] = by_stem[stem] = (where, fingerprint)
+
+                result.ids.add(entry["id"])
+                if only and entry["id"] not in only:
+                    continue
+                result.total += 1
+                if visit is not None:
+                    visit(entry)
+        except (ManifestError, OSError) as e:
+            result.errors.append(str(e))
+    return result
+
+
+def stream(paths, only=None):
+    """Entradas únicas de todos los manifiestos, leídas bajo demanda.
+
+    Asume que `scan()` ya validó los ficheros: aquí solo se deduplica.
+    """
+    seen_ids = set()
+    seen_outputs = set()
+    for path in paths:
+        for entry in iter_entries(path):
+            if entry["id"] in seen_ids or entry["output"] in seen_outputs:
+                continue
+            seen_ids.add(entry["id"])
+            seen_outputs.add(entry["output"])
+            if only and entry["id"] not in only:
+                continue
+            yield entry
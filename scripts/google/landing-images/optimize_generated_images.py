@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Optimizador del árbol public/images/generated.
+
+Recodifica los PNG/WebP demasiado grandes, elimina duplicados exactos o
+perceptualmente idénticos (p. ej. `benefit-ahorro-dashboard 2.webp`) y
+muestra los bytes ahorrados por fichero. Un índice mtime+hash hace que una
+segunda pasada solo procese los ficheros que han cambiado.
+
+Las salidas que gestiona generate_benefits_images.py (las registradas en
+generated-images.lock.json y las variantes responsive `-<ancho>w`) no se
+tocan: se regeneran desde su manifiesto y `--check` valida sus tamaños.
+
+Uso: python optimize_generated_images.py [public/images/generated] [--dry-run]
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from urllib.parse import unquote
+from concurrent.futures import ProcessPoolExecutor
+
+from image_encoding import FORMATS, encode_bytes, encoding_available, write_atomic
+from output_lock import DEFAULT_LOCK, OutputLock
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_ROOT = "public/images/generated"
+DEFAULT_INDEX = Path(__file__).resolve().parent / ".cache" / "optimize-index.json"
+SOURCE_DIRS = ("app", "components", "lib")
+EXTENSIONS = {".png", ".webp", ".jpg", ".jpeg"}
+
+# Sufijos de copias creadas por el Finder/Explorer: "foo 2.webp", "foo copy.png"
+COPY_SUFFIX = re.compile(r"( \d+| copy| copia)$", re.IGNORECASE)
+# Variantes responsive que escribe el generador: "foo-640w.webp"
+VARIANT_SUFFIX = re.compile(r"-\d+w$")
+
+
+def fingerprint(img):
+    """Huellas perceptuales: dHash de 64 bits + miniatura de color 4x4.
+
+    El dHash compara luminancia, así que por sí solo no distingue una imagen
+    de su versión recoloreada; la miniatura RGB cubre ese caso.
+    """
+    pixels = img.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    thumb = list(img.convert("RGB").resize((4, 4), Image.LANCZOS).tobytes())
+    return f"{bits:016x}", thumb
+
+
+def analyze(path):
+    """Entrada del índice para un fichero. Se ejecuta en el pool."""
+    path = Path(path)
+    data = path.read_bytes()
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.size
+        dhash, thumb = fingerprint(img)
+
+    stat = path.stat()
+    return {
+        "size": len(data),
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "width": width,
+        "height": height,
+        "dhash": dhash,
+        "thumb": thumb,
+        "optimized": False,
+    }
+
+
+def optimize(path, record, options):
+    """Recodifica un fichero sobredimensionado. Se ejecuta en el pool.
+
+    Devuelve (bytes antes, bytes después, entrada del índice actualizada).
+    """
+    path = Path(path)
+    before = record["size"]
+    too_wide = record["width"] > options["max_width"]
+    if before <= options["max_bytes"] and not too_wide:
+        return before, before, {**record, "optimized": True}
+
+    data = path.read_bytes()
+    target = options["max_width"] if too_wide else None
+    encoded = encode_bytes(data, FORMATS[path.suffix.lower()], target, options)
+    # Solo se sustituye si el ahorro compensa la pérdida de generación
+    if len(encoded) >= before * (1 - options["min_gain"]):
+        return before, before, {**record, "optimized": True}
+    if options["dry_run"]:
+        return before, len(encoded), record
+
+    write_atomic(path, encoded)
+    return before, len(encoded), {**analyze(path), "optimized": True}
+
+
+def load_index(index_path):
+    try:
+        with open(index_path, "r") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index_path, files):
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_suffix(".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": 1, "files": files}, f, indent=2, sort_keys=True)
+    os.replace(tmp, index_path)
+
+
+def find_project_root(start):
+    """Primer ancestro de `start` con package.json (raíz del proyecto Next)"""
+    for parent in [start, *start.parents]:
+        if (parent / "package.json").exists():
+            return parent
+    return None
+
+
+def referenced_names(project_root):
+    """Rutas bajo /images/generated/ usadas en el código fuente.
+
+    Se guardan relativas a ese directorio (`backup/foo.webp`), no solo el
+    nombre: una copia en backup/ no está en uso por llamarse igual.
+    """
+    pattern = re.compile(r"/images/generated/([^\"'`)?#\s]+)")
+    names = set()
+    for source_dir in SOURCE_DIRS:
+        for path in (project_root / source_dir).rglob("*"):
+            if path.suffix in {".ts", ".tsx", ".js", ".jsx", ".css", ".mdx"}:
+                found = pattern.findall(path.read_text(errors="ignore"))
+                names.update(unquote(name) for name in found)
+    return names
+
+
+def is_duplicate(a, b, threshold):
+    """Idénticos en bytes, o mismo tamaño, dHash (± threshold bits) y color.
+
+    Las huellas no dependen del tamaño, así que sin comparar dimensiones una
+    miniatura contaría como duplicado de la imagen completa.
+    """
+    if a["sha256"] == b["sha256"]:
+        return True
+    if (a["width"], a["height"]) != (b["width"], b["height"]):
+        return False
+    distance = bin(int(a["dhash"], 16) ^ int(b["dhash"], 16)).count("1")
+    if distance > threshold:
+        return False
+    return max(abs(x - y) for x, y in zip(a["thumb"], b["thumb"])) <= 8
+
+
+def keeper_rank(rel, record, referenced):
+    """Orden de preferencia al elegir qué copia conservar (menor = mejor).
+
+    A igualdad de referencias y ubicación se conserva la de mayor ancho, y
+    solo después la más ligera.
+    """
+    path = Path(rel)
+    return (
+        rel not in referenced,
+        any(part.startswith("backup") for part in path.parts[:-1]),
+        bool(COPY_SUFFIX.search(path.stem)),
+        -record["width"],
+        record["size"],
+        rel,
+    )
+
+
+def generator_managed(path, managed):
+    """True si el fichero lo gestiona generate_benefits_images.py"""
+    return bool(VARIANT_SUFFIX.search(path.stem)) or path.resolve() in managed
+
+
+def managed_paths(lock_path, base):
+    """Rutas absolutas de las salidas registradas en el lock del generador"""
+    return {(base / path).resolve() for path in OutputLock(lock_path).managed_files()}
+
+
+def find_duplicates(files, referenced, threshold, protected=()):
+    """Devuelve {fichero a eliminar: fichero que se conserva}.
+
+    Los ficheros referenciados desde el código y los de `protected` nunca se
+    eliminan (sí pueden ser el original del que otro es duplicado).
+    """
+    ranked = sorted(files, key=lambda rel: keeper_rank(rel, files[rel], referenced))
+    keepers = []
+    drop = {}
+    for rel in ranked:
+        match = next(
+            (k for k in keepers if is_duplicate(files[rel], files[k], threshold)),
+            None,
+        )
+        if match is None or rel in referenced or rel in protected:
+            keepers.append(rel)
+        else:
+            drop[rel] = match
+    return drop
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Optimiza y deduplica las imágenes de public/images/generated"
+    )
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Muestra el ahorro sin modificar ni borrar ficheros",
+    )
+    parser.add_argument(
+        "--max-kb",
+        type=int,
+        default=300,
+        help="Recodifica ficheros por encima de este tamaño (por defecto: 300)",
+    )
+    parser.add_argument(
+        "--max-width",
+        type=int,
+        default=1920,
+        help="Ancho máximo; el mayor de deviceSizes (por defecto: 1920)",
+    )
+    parser.add_argument("--quality", type=int, default=82)
+    parser.add_argument("--effort", type=int, default=6)
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=2,
+        help="Bits de diferencia de dHash para considerar dos imágenes iguales",
+    )
+    parser.add_argument("--no-dedupe", action="store_true")
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX)
+    parser.add_argument(
+        "--lock",
+        type=Path,
+        default=DEFAULT_LOCK,
+        help="Lock del generador; sus salidas no se deduplican ni recodifican",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    if not encoding_available():
+        print("❌ Error: Pillow no está instalado")
+        print("💡 Ejecuta: pip install pillow")
+        sys.exit(1)
+
+    root = Path(args.root)
+    if not root.is_dir():
+        print(f"❌ No existe el directorio: {root}")
+        sys.exit(1)
+
+    options = {
+        "max_bytes": args.max_kb * 1024,
+        "max_width": args.max_width,
+        "min_gain": 0.05,
+        "quality": args.quality,
+        "avif_quality": 60,
+        "effort": args.effort,
+        "dry_run": args.dry_run,
+    }
+
+    paths = sorted(
+        p
+        for p in root.rglob("*")
+        if p.suffix.lower() in EXTENSIONS and not p.name.startswith(".")
+    )
+    index = load_index(args.index)
+    files = {}
+    stale = []
+    for path in paths:
+        rel = path.relative_to(root).as_posix()
+        stat = path.stat()
+        cached = index.get(rel)
+        if (
+            cached
+            and "height" in cached
+            and cached["mtime_ns"] == stat.st_mtime_ns
+            and cached["size"] == stat.st_size
+        ):
+            files[rel] = cached
+        else:
+            stale.append(path)
+
+    # Las rutas del lock son relativas a la raíz del proyecto (desde donde se
+    # ejecuta el generador)
+    project_root = find_project_root(root.resolve())
+    managed = managed_paths(args.lock, project_root or Path.cwd())
+    protected = {
+        path.relative_to(root).as_posix()
+        for path in paths
+        if generator_managed(path, managed)
+    }
+
+    print(f"🔍 {len(paths)} imágenes · {len(stale)} nuevas o modificadas")
+    print(f"🔒 Gestionadas por el generador (no se tocan): {len(protected)}\n")
+
+    saved_total = 0
+    with ProcessPoolExecutor(args.workers) as pool:
+        # 1. Huellas de los ficheros nuevos o modificados
+        records = pool.map(analyze, map(str, stale), chunksize=4)
+        for path, record in zip(stale, records):
+            files[path.relative_to(root).as_posix()] = record
+
+        # 2. Duplicados: se eliminan antes de gastar CPU recodificándolos
+        if not args.no_dedupe and project_root is None:
+            # Sin el código fuente no se puede saber qué imágenes están en uso
+            print("⚠️  No se encontró package.json: se omite la deduplicación")
+        elif not args.no_dedupe:
+            referenced = referenced_names(project_root)
+            duplicates = find_duplicates(
+                files, referenced, args.threshold, protected=protected
+            )
+            for rel, keeper in sorted(duplicates.items()):
+                size = files.pop(rel)["size"]
+                saved_total += size
+                print(f"🗑️  {rel} (duplicado de {keeper}) -{size / 1024:.0f} KB")
+                if not args.dry_run:
+                    (root / rel).unlink()
+
+        # 3. Recodificación de lo que sigue sobredimensionado
+        pending = sorted(
+            rel
+            for rel, rec in files.items()
+            if not rec["optimized"] and rel not in protected
+        )
+        results = pool.map(
+            optimize,
+            [str(root / rel) for rel in pending],
+            [files[rel] for rel in pending],
+            [options] * len(pending),
+        )
+        for rel, (before, after, record) in zip(pending, results):
+            files[rel] = record
+            if after < before:
+                saved_total += before - after
+                print(
+                    f"🗜️  {rel}: {before / 1024:.0f} KB → {after / 1024:.0f} KB "
+                    f"(-{(before - after) / 1024:.0f} KB)"
+                )
+
+    # El índice solo refleja el estado real del disco, así que vale también en
+    # --dry-run (lo pendiente sigue marcado como no optimizado)
+    save_index(args.index, files)
+
+    print("\n" + "=" * 50)
+    action = "Ahorro estimado" if args.dry_run else "Ahorro"
+    print(f"💾 {action}: {saved_total / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
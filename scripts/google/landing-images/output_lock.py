@@ -0,0 +1,150 @@
+"""
+Registro (lock) de las salidas generadas, para `--check` y ejecuciones no-op.
+
+Por cada `output` guarda la clave del prompt, un hash de las opciones de
+codificación y los ficheros escritos (ruta y tamaño). Por cada manifiesto
+guarda el sha256 de su contenido y sus salidas: si el manifiesto no ha
+cambiado, `--check` ni siquiera necesita parsear el YAML y se limita a
+comprobar con `stat` y unos pocos bytes de cabecera que cada fichero sigue
+ahí, con el mismo tamaño y codificado en el formato de su extensión.
+
+El fichero está pensado para versionarse junto a los manifiestos, de modo
+que el hook de CI pueda validar los assets sin caché local. Las salidas
+registradas con `--adopt` sin todas sus variantes llevan la codificación
+ADOPTED: `--check` las acepta, pero el generador las recodifica.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+DEFAULT_LOCK = Path(__file__).resolve().parent / "generated-images.lock.json"
+# Codificación de una salida adoptada tal cual, pendiente de recodificar
+ADOPTED = "adopted"
+
+# Firmas de cabecera por extensión
+MAGIC = {
+    ".png": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    ".webp": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP",
+    ".avif": lambda head: head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"),
+    ".jpg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    ".jpeg": lambda head: head.startswith(b"\xff\xd8\xff"),
+}
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def encode_digest(options):
+    """Hash de las opciones de codificación (None = bytes sin recodificar)"""
+    payload = json.dumps(options, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def verify_file(path, size):
+    """Motivo por el que un fichero no es válido, o None si lo es"""
+    try:
+        if os.stat(path).st_size != size:
+            return f"{path}: el tamaño no coincide con el registrado"
+        with open(path, "rb") as f:
+            head = f.read(12)
+    except OSError:
+        return f"{path}: no existe"
+    check = MAGIC.get(Path(path).suffix.lower())
+    if check is not None and not check(head):
+        return f"{path}: el contenido no es {Path(path).suffix.lstrip('.').upper()}"
+    return None
+
+
+class OutputLock:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.outputs = data.get("outputs", {})
+        self.manifests = data.get("manifests", {})
+
+    def problems(self, output, key=None, encoding=None, accept_adopted=False):
+        """Motivos por los que `output` no está al día (lista vacía = al día).
+
+        Sin `key`/`encoding` solo se comprueban los ficheros registrados. Con
+        `accept_adopted` una salida adoptada vale con cualquier codificación.
+        """
+        entry = self.outputs.get(output)
+        if entry is None:
+            return [f"{output}: nunca se ha generado"]
+        if key is not None and entry["key"] != key:
+            return [f"{output}: el prompt ha cambiado"]
+        if accept_adopted and entry["encoding"] == ADOPTED:
+            encoding = None
+        if encoding is not None and entry["encoding"] != encoding:
+            return [f"{output}: las opciones de codificación han cambiado"]
+        found = (verify_file(path, size) for path, size in entry["files"])
+        return [problem for problem in found if problem]
+
+    def adopted(self, output, key):
+        """Fichero principal de una salida adoptada válida, o None"""
+        entry = self.outputs.get(output)
+        if entry is None or entry["key"] != key or entry["encoding"] != ADOPTED:
+            return None
+        if self.problems(output):
+            return None
+        return entry["files"][0][0]
+
+    def adopted_count(self):
+        return sum(
+            1 for entry in self.outputs.values() if entry["encoding"] == ADOPTED
+        )
+
+    def record(self, output, img_id, key, encoding, files):
+        with self.lock:
+            self.outputs[output] = {
+                "id": img_id,
+                "key": key,
+                "encoding": encoding,
+                "files": [[str(path), size] for path, size in files],
+            }
+
+    def managed_files(self):
+        """Rutas de todos los ficheros registrados (salidas y variantes)"""
+        return {path for entry in self.outputs.values() for path, _ in entry["files"]}
+
+    def manifest_outputs(self, manifest, digest, encoded=True):
+        """Salidas de un manifiesto sin cambios desde que se registró, o None"""
+        entry = self.manifests.get(str(manifest))
+        if entry is None or entry["sha256"] != digest or entry["encoded"] != encoded:
+            return None
+        return entry["outputs"]
+
+    def record_manifest(self, manifest, digest, encoded, outputs):
+        """Registra las salidas de un manifiesto al día (None = no lo están)"""
+        with self.lock:
+            if outputs is None:
+                self.manifests.pop(str(manifest), None)
+            else:
+                self.manifests[str(manifest)] = {
+                    "sha256": digest,
+                    "encoded": encoded,
+                    "outputs": outputs,
+                }
+
+    def save(self):
+        with self.lock:
+            payload = {
+                "version": 1,
+                "manifests": self.manifests,
+                "outputs": self.outputs,
+            }
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(payload, f, indent=2, sort_keys=True)
+                f.write("\n")
+            os.replace(tmp, self.path)
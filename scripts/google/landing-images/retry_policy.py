@@ -0,0 +1,92 @@
+"""
+Política de reintentos para las llamadas a Imagen.
+
+Distingue los errores transitorios (cuota agotada, timeouts, 5xx), que se
+reintentan con backoff exponencial y jitter respetando la pista
+`Retry-After`/`RetryInfo` de la API, de los definitivos (peticiones
+inválidas, credenciales, bloqueos de seguridad), que fallan a la primera.
+"""
+
+import re
+import random
+
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+# Excepciones de red de httpx/requests, por nombre para no depender de ellas
+TRANSIENT_NAMES = {
+    "TimeoutError",
+    "TimeoutException",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "WriteTimeout",
+    "PoolTimeout",
+    "ConnectError",
+    "ReadError",
+    "RemoteProtocolError",
+    "ConnectionError",
+    "ConnectionResetError",
+}
+
+
+def classify(exc):
+    """Devuelve RETRYABLE o FATAL para una excepción de la API"""
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return RETRYABLE if code in RETRYABLE_CODES or code >= 500 else FATAL
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    return RETRYABLE if names & TRANSIENT_NAMES else FATAL
+
+
+def _find_retry_delay(payload):
+    """Busca `retryDelay` ("12s", "1.5s") en el JSON de error de Google"""
+    if isinstance(payload, dict):
+        delay = payload.get("retryDelay")
+        if isinstance(delay, str):
+            match = re.fullmatch(r"([\d.]+)s", delay.strip())
+            if match:
+                return float(match.group(1))
+        payload = list(payload.values())
+    if isinstance(payload, list):
+        for item in payload:
+            delay = _find_retry_delay(item)
+            if delay is not None:
+                return delay
+    return None
+
+
+def retry_after(exc):
+    """Segundos de espera sugeridos por la API, o None"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass  # formato fecha HTTP: se usa el backoff normal
+    return _find_retry_delay(getattr(exc, "details", None))
+
+
+class RetryPolicy:
+    """Backoff exponencial con full jitter, acotado a `max_delay`"""
+
+    def __init__(self, max_retries=4, base_delay=2.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, exc, attempt):
+        """`attempt` es el número de intentos ya realizados (1 = el primero)"""
+        return attempt <= self.max_retries and classify(exc) == RETRYABLE
+
+    def delay(self, exc, attempt):
+        """Segundos a esperar antes del intento `attempt + 1`"""
+        hint = retry_after(exc)
+        if hint is not None:
+            # La pista de la API manda; el jitter evita que los hilos
+            # reintenten todos a la vez
+            return min(self.max_delay, hint) * random.uniform(1.0, 1.25)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
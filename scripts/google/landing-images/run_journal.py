@@ -0,0 +1,61 @@
+"""
+Diario de ejecución append-only (JSONL) para reanudar manifiestos largos.
+
+Cada imagen terminada añade una línea con su id, la clave de caché del prompt
+y la ruta de salida. Con `--resume` se saltan las entradas cuyo id y clave
+coinciden con una línea del diario y cuya salida sigue en disco; si el prompt
+cambió, la clave ya no coincide y la imagen se vuelve a generar.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+
+class RunJournal:
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.completed = self._load() if resume else {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Sin --resume se empieza un diario nuevo
+        self.file = open(self.path, "a" if resume else "w")
+
+    def _load(self):
+        completed = {}
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea truncada por un corte a mitad de escritura
+                        continue
+                    completed[entry["id"]] = entry
+        except OSError:
+            pass
+        return completed
+
+    def is_done(self, img_id, key, output):
+        entry = self.completed.get(img_id)
+        return (
+            entry is not None
+            and entry["key"] == key
+            and entry["output"] == output
+            and Path(output).exists()
+        )
+
+    def record(self, img_id, key, output):
+        """Añade una imagen terminada y fuerza la escritura a disco"""
+        entry = {"id": img_id, "key": key, "output": output, "ts": time.time()}
+        with self.lock:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.completed[img_id] = entry
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,146 @@
+"""
+Métricas de rendimiento de una ejecución del generador.
+
+`build_report()` convierte los resultados por imagen (latencia de la API,
+tiempo de puntuación y codificación, bytes escritos, intentos) en un informe
+JSON con percentiles, coste real frente a estimado y tasa de aciertos de
+caché, para comparar ejecuciones y ajustar la concurrencia con datos. La
+suma de tiempos por imagen es solo una cota superior del tiempo en serie; el
+speedup medido de verdad lo da tests/image-generator-benchmark.py.
+
+`Profiler` envuelve llamadas concretas (generate_image, save_image) en
+cProfile cuando se pide `--profile`, y no hace nada en caso contrario.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Percentiles por rango más cercano, más media y máximo"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    summary = {
+        f"p{point}": round(ordered[max(0, -(-point * len(ordered) // 100) - 1)], 4)
+        for point in points
+    }
+    summary["mean"] = round(sum(ordered) / len(ordered), 4)
+    summary["max"] = round(ordered[-1], 4)
+    return summary
+
+
+def build_report(results, wall_time, settings, estimated_cost, price_per_image):
+    """Informe de la ejecución a partir de los resultados de process_image"""
+    # Las reanudadas y las que ya estaban al día según el lock no se procesan
+    worked = [r for r in results if not r["resumed"] and not r["current"]]
+    cache_hits = sum(1 for r in worked if r["cached"])
+    called = [r for r in worked if r["attempts"]]
+    billed = sum(r["billed_images"] for r in results)
+    # Medida durante la ejecución concurrente: incluye las colas por recursos
+    # compartidos (pool de codificación), así que acota el serie por arriba
+    serial_bound = sum(r["elapsed"] for r in results)
+
+    images = [
+        {
+            "id": r["id"],
+            "output": r["output"],
+            "ok": r["ok"],
+            "cached": r["cached"],
+            "resumed": r["resumed"],
+            "current": r["current"],
+            "attempts": r["attempts"],
+            "billed_images": r["billed_images"],
+            "api_latency_s": round(r["api_latency"], 4),
+            "score_s": round(r["score_time"], 4),
+            "encode_s": round(r["encode_time"], 4),
+            "bytes_written": r["bytes_written"],
+            "elapsed_s": round(r["elapsed"], 4),
+        }
+        for r in results
+    ]
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": settings,
+        "wall_time_s": round(wall_time, 4),
+        "serial_upper_bound_s": round(serial_bound, 4),
+        "speedup_upper_bound": (
+            round(serial_bound / wall_time, 3) if wall_time else None
+        ),
+        "aggregate": {
+            "images": len(results),
+            "ok": sum(1 for r in results if r["ok"]),
+            "failed": sum(1 for r in results if not r["ok"]),
+            "resumed": sum(1 for r in results if r["resumed"]),
+            "up_to_date": sum(1 for r in results if r["current"]),
+            "cache_hits": cache_hits,
+            "cache_hit_rate": round(cache_hits / len(worked), 4) if worked else None,
+            "requests": sum(r["attempts"] for r in results),
+            "bytes_written": sum(r["bytes_written"] for r in results),
+            "api_latency_s": percentiles([r["api_latency"] for r in called]),
+            "encode_s": percentiles([r["encode_time"] for r in worked if r["ok"]]),
+            "elapsed_s": percentiles([r["elapsed"] for r in worked]),
+        },
+        "cost": {
+            "price_per_image_usd": price_per_image,
+            "estimated_usd": round(estimated_cost, 2),
+            "actual_usd": round(billed * price_per_image, 2),
+            "billed_images": billed,
+        },
+        "images": images,
+    }
+
+
+def write_report(path, report):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class Profiler:
+    """Perfila con cProfile las llamadas hechas a través de `call()`.
+
+    Cada llamada usa su propio perfil (cProfile es por hilo) y se acumula en
+    un único pstats.Stats al terminar.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = None
+        self.lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python >= 3.12 solo admite un perfilador activo a la vez
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self.lock:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+
+    def dump(self, path):
+        """Guarda el perfil acumulado; devuelve False si no hay datos"""
+        if self.stats is None:
+            return False
+        self.stats.dump_stats(str(path))
+        return True
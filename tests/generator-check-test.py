@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests de `generate_benefits_images.py --check` contra el lock versionado.
+
+El hook de CI ejecuta `--check` en cada commit: con el lock al día debe
+tomar el camino rápido (stat + cabeceras) sin importar PyYAML, Pillow ni
+NumPy. Si alguien edita un manifiesto sin volver a ejecutar el generador
+(o `--adopt`), el lock queda desfasado y este test lo detecta.
+
+Uso: python tests/generator-check-test.py
+"""
+
+import sys
+import json
+import subprocess
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR_DIR = ROOT / "scripts" / "google" / "landing-images"
+SCRIPT = GENERATOR_DIR / "generate_benefits_images.py"
+LOCK = GENERATOR_DIR / "generated-images.lock.json"
+MANIFESTS = "scripts/google/landing-images/*.yaml"
+
+sys.path.insert(0, str(GENERATOR_DIR))
+
+from output_lock import file_digest  # noqa: E402
+
+# Ejecuta --check y muestra al final qué módulos pesados se importaron
+PROBE = """
+import sys, runpy
+sys.path.insert(0, {generator_dir!r})
+sys.argv = [{script!r}, "--check", {manifests!r}]
+try:
+    runpy.run_path({script!r}, run_name="__main__")
+finally:
+    heavy = {{"yaml", "PIL", "numpy", "google.genai"}} & set(sys.modules)
+    print("HEAVY=" + ",".join(sorted(heavy)))
+"""
+
+
+class CommittedLockTest(unittest.TestCase):
+    def test_manifest_digests_are_current(self):
+        lock = json.loads(LOCK.read_text())
+        for manifest, entry in lock["manifests"].items():
+            self.assertEqual(
+                entry["sha256"],
+                file_digest(ROOT / manifest),
+                f"{manifest} cambió: ejecuta el generador o --adopt",
+            )
+
+    def test_check_takes_the_fast_path(self):
+        code = PROBE.format(
+            generator_dir=str(GENERATOR_DIR),
+            script=str(SCRIPT),
+            manifests=MANIFESTS,
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stdout + proc.stderr)
+        self.assertIn("HEAVY=\n", proc.stdout + "\n")
+        self.assertIn("al día", proc.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
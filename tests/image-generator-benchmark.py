@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline del generador de imágenes (scripts/google/landing-images).
+
+Usa FakeBackend, así que no hace red ni cuesta dinero. Sobre un manifiesto
+sintético reproducible mide:
+1. Serie vs concurrente (caché fría; con --encode incluye la codificación)
+2. Caché fría vs caliente
+3. Throughput de la etapa de codificación WebP/AVIF (1 proceso vs todos)
+
+Uso: python tests/image-generator-benchmark.py [--images 12] [--json out.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR_DIR = ROOT / "scripts" / "google" / "landing-images"
+sys.path.insert(0, str(GENERATOR_DIR))
+
+from generate_benefits_images import RunContext, run_images  # noqa: E402
+from generation_cache import GenerationCache  # noqa: E402
+from image_encoding import (  # noqa: E402
+    DEFAULT_ENCODE,
+    encode_image,
+    encode_pool,
+    encoding_available,
+)
+from imagen_backends import FakeBackend  # noqa: E402
+from manifest import scan, stream  # noqa: E402
+
+ASPECT_RATIOS = ["4:3", "16:9", "1:1"]
+
+
+def write_manifest(path, count):
+    """Manifiesto sintético: `count` entradas con prompts y proporciones fijas"""
+    lines = ["images:"]
+    for i in range(count):
+        lines += [
+            f'  - id: "bench-{i:03d}"',
+            f'    prompt: "Synthetic benchmark prompt number {i}, brand blue #2563EB"',
+            f'    output: "out/bench-{i:03d}.webp"',
+            f'    aspect_ratio: "{ASPECT_RATIOS[i % len(ASPECT_RATIOS)]}"',
+        ]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def run(manifest, cache_dir, backend, concurrency, pool=None):
+    """Ejecuta el generador completo y devuelve (segundos, resultados)"""
+    cache = GenerationCache(cache_dir)
+    ctx = RunContext(backend, cache, pool, rpm=0)
+    total = scan([manifest]).total
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_images(ctx, stream([manifest]), total, concurrency)
+    elapsed = time.perf_counter() - start
+    cache.save()
+    assert all(r["ok"] for r in results), "el backend fake no debería fallar"
+    return elapsed, results
+
+
+def bench_generation(workdir, args):
+    manifest = workdir / "bench.yaml"
+    write_manifest(manifest, args.images)
+
+    def backend():
+        return FakeBackend(
+            latency=args.latency,
+            jitter=args.latency * 0.1,
+            payload_kb=args.payload_kb,
+            seed=args.seed,
+        )
+
+    pool = encode_pool() if args.encode else None
+    cold_cache = workdir / "cache-concurrent"
+    try:
+        serial, _ = run(manifest, workdir / "cache-serial", backend(), 1, pool)
+        concurrent, _ = run(manifest, cold_cache, backend(), args.concurrency, pool)
+        hot, results = run(manifest, cold_cache, backend(), args.concurrency, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {
+        "serial_s": round(serial, 3),
+        "concurrent_s": round(concurrent, 3),
+        "concurrency": args.concurrency,
+        "speedup": round(serial / concurrent, 2),
+        "cache_cold_s": round(concurrent, 3),
+        "cache_hot_s": round(hot, 3),
+        "cache_hits": sum(1 for r in results if r["cached"]),
+    }
+
+
+def bench_encoding(workdir, args):
+    if not encoding_available():
+        return None
+
+    backend = FakeBackend(latency=0, payload_kb=args.payload_kb, seed=args.seed)
+    payloads = [
+        backend.generate(f"encode {i}", "4:3", 1)[0].image_bytes
+        for i in range(args.encode_images)
+    ]
+
+    timings = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        with ProcessPoolExecutor(workers) as pool:
+            start = time.perf_counter()
+            written = 0
+            for i, payload in enumerate(payloads):
+                output = workdir / f"encode-{workers}" / f"img-{i}.webp"
+                written += len(encode_image(pool, payload, output, DEFAULT_ENCODE))
+            elapsed = time.perf_counter() - start
+        timings[workers] = {
+            "seconds": round(elapsed, 3),
+            "images_per_s": round(len(payloads) / elapsed, 2),
+            "files_written": written,
+        }
+    return timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--payload-kb", type=int, default=1500)
+    parser.add_argument("--encode-images", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument(
+        "--encode",
+        action="store_true",
+        help="Codifica WebP/AVIF en serie vs concurrente (como el generador real)",
+    )
+    parser.add_argument("--json", type=Path, help="Guarda los resultados en JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.encode and not encoding_available():
+        sys.exit("❌ --encode necesita Pillow: pip install pillow pillow-avif-plugin")
+
+    with tempfile.TemporaryDirectory(prefix="imagen-bench-") as tmp:
+        workdir = Path(tmp)
+        cwd = os.getcwd()
+        # Las rutas `output` del manifiesto son relativas al directorio actual
+        os.chdir(workdir)
+        try:
+            generation = bench_generation(workdir, args)
+            encoding = bench_encoding(workdir, args)
+        finally:
+            os.chdir(cwd)
+
+    print("=" * 60)
+    print("IMAGE GENERATOR BENCHMARK (FakeBackend)")
+    print("=" * 60)
+    print(f"Imágenes: {args.images} · latencia simulada: {args.latency}s")
+    print(f"Serie:              {generation['serial_s']:.2f}s")
+    print(
+        f"Concurrente (x{generation['concurrency']}):  "
+        f"{generation['concurrent_s']:.2f}s  (speedup x{generation['speedup']})"
+    )
+    print(
+        f"Caché fría/caliente: {generation['cache_cold_s']:.2f}s / "
+        f"{generation['cache_hot_s']:.2f}s  ({generation['cache_hits']} aciertos)"
+    )
+    if encoding is None:
+        print("Codificación: omitida (Pillow no está instalado)")
+    else:
+        for workers, timing in encoding.items():
+            print(
+                f"Codificación ({workers} proc.): {timing['seconds']:.2f}s · "
+                f"{timing['images_per_s']} img/s · {timing['files_written']} ficheros"
+            )
+
+    if args.json:
+        results = {"generation": generation, "encoding": encoding, "args": vars(args)}
+        args.json.write_text(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
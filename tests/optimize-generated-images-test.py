@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests de la deduplicación de optimize_generated_images.py.
+
+El optimizador borra ficheros, así que aquí se fija qué copia se conserva:
+nunca una variante responsive en lugar de la salida a tamaño completo, ni
+nada que gestione el generador.
+
+Uso: python tests/optimize-generated-images-test.py
+"""
+
+import io
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+GENERATOR_DIR = ROOT / "scripts" / "google" / "landing-images"
+sys.path.insert(0, str(GENERATOR_DIR))
+
+from image_encoding import encoding_available  # noqa: E402
+from optimize_generated_images import (  # noqa: E402
+    find_duplicates,
+    generator_managed,
+    keeper_rank,
+)
+
+DHASH = "0f0f0f0f0f0f0f0f"
+THUMB = [0x25, 0x63, 0xEB] * 16
+
+
+def record(width, height, size, sha256=None):
+    """Entrada del índice con las mismas huellas perceptuales para todas"""
+    return {
+        "size": size,
+        "sha256": sha256 or f"{width}x{height}:{size}",
+        "width": width,
+        "height": height,
+        "dhash": DHASH,
+        "thumb": THUMB,
+    }
+
+
+class FindDuplicatesTest(unittest.TestCase):
+    def test_variants_of_different_size_are_not_duplicates(self):
+        files = {
+            "hero.webp": record(1408, 768, 330_000),
+            "hero-640w.webp": record(640, 349, 40_000),
+            "hero-1200w.webp": record(1200, 655, 210_000),
+        }
+        self.assertEqual(find_duplicates(files, set(), threshold=2), {})
+
+    def test_copy_and_backup_are_dropped_for_the_original(self):
+        files = {
+            "hero.webp": record(1408, 768, 330_000),
+            "hero 2.webp": record(1408, 768, 300_000),
+            "backup/hero.webp": record(1408, 768, 280_000),
+        }
+        self.assertEqual(
+            find_duplicates(files, set(), threshold=2),
+            {"hero 2.webp": "hero.webp", "backup/hero.webp": "hero.webp"},
+        )
+
+    def test_backup_of_a_referenced_original_is_dropped(self):
+        same = record(1408, 768, 330_000, sha256="same")
+        files = {"hero.webp": same, "backup/hero.webp": same}
+        drop = find_duplicates(files, {"hero.webp"}, threshold=2)
+        self.assertEqual(drop, {"backup/hero.webp": "hero.webp"})
+
+    def test_referenced_backup_is_kept(self):
+        files = {
+            "hero.webp": record(1408, 768, 330_000),
+            "backup/hero.webp": record(1408, 768, 280_000),
+        }
+        drop = find_duplicates(files, {"backup/hero.webp"}, threshold=2)
+        self.assertEqual(drop, {"hero.webp": "backup/hero.webp"})
+
+    def test_referenced_file_is_kept(self):
+        files = {
+            "hero.webp": record(1408, 768, 330_000),
+            "hero 2.webp": record(1408, 768, 300_000),
+        }
+        drop = find_duplicates(files, {"hero 2.webp"}, threshold=2)
+        self.assertEqual(drop, {"hero.webp": "hero 2.webp"})
+
+    def test_protected_file_is_never_dropped(self):
+        files = {
+            "hero.webp": record(1408, 768, 330_000),
+            "backup/hero.webp": record(1408, 768, 280_000),
+        }
+        drop = find_duplicates(
+            files, set(), threshold=2, protected={"backup/hero.webp"}
+        )
+        self.assertEqual(drop, {})
+
+    def test_identical_bytes_keep_the_wider_file(self):
+        wide = record(1408, 768, 330_000, sha256="same")
+        narrow = record(640, 349, 40_000, sha256="same")
+        ranked = sorted(
+            {"a.webp": narrow, "b.webp": wide}.items(),
+            key=lambda item: keeper_rank(item[0], item[1], set()),
+        )
+        self.assertEqual([rel for rel, _ in ranked], ["b.webp", "a.webp"])
+
+    def test_generator_managed(self):
+        managed = {Path("/tmp/lock/hero.webp").resolve()}
+        self.assertTrue(generator_managed(Path("hero-640w.webp"), managed))
+        self.assertTrue(generator_managed(Path("/tmp/lock/hero.webp"), managed))
+        self.assertFalse(generator_managed(Path("hero 2.webp"), managed))
+
+
+@unittest.skipUnless(encoding_available(), "Pillow no está instalado")
+class SweepTest(unittest.TestCase):
+    """Pasada completa sobre una salida del generador y sus variantes"""
+
+    def test_generator_outputs_survive_a_sweep(self):
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as tmp:
+            project = Path(tmp)
+            (project / "package.json").write_text("{}")
+            generated = project / "public" / "images" / "generated"
+            generated.mkdir(parents=True)
+
+            image = Image.linear_gradient("L").resize((1408, 768)).convert("RGB")
+            sizes = {}
+            for name, width in (("hero.webp", 1408), ("hero-640w.webp", 640)):
+                buffer = io.BytesIO()
+                image.resize((width, width * 768 // 1408)).save(buffer, "WEBP")
+                (generated / name).write_bytes(buffer.getvalue())
+                sizes[name] = len(buffer.getvalue())
+            lock = project / "generated-images.lock.json"
+            files = [["public/images/generated/hero.webp", sizes["hero.webp"]]]
+            lock.write_text(json.dumps({"outputs": {"hero": {"files": files}}}))
+
+            subprocess.run(
+                [
+                    sys.executable,
+                    str(GENERATOR_DIR / "optimize_generated_images.py"),
+                    str(generated),
+                    "--max-kb",
+                    "1",
+                    "--lock",
+                    str(lock),
+                    "--index",
+                    str(project / "index.json"),
+                    "--workers",
+                    "1",
+                ],
+                cwd=project,
+                check=True,
+                capture_output=True,
+                env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            )
+
+            for name, size in sizes.items():
+                self.assertEqual((generated / name).stat().st_size, size, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
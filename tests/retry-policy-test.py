@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests de retry_policy.py: qué errores de la API se reintentan y cuánto se
+espera. Cada reintento de una petición de pago puede facturarse, así que
+aquí se fija la clasificación y el límite de reintentos.
+
+Uso: python tests/retry-policy-test.py
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts" / "google" / "landing-images"))
+
+from retry_policy import (  # noqa: E402
+    FATAL,
+    RETRYABLE,
+    RetryPolicy,
+    classify,
+    retry_after,
+)
+
+
+class APIError(Exception):
+    """Misma forma que `google.genai.errors.APIError`"""
+
+    def __init__(self, code, details=None, headers=None):
+        super().__init__(f"{code}")
+        self.code = code
+        self.details = details
+        self.response = None
+        if headers:
+            self.response = type("Response", (), {"headers": headers})()
+
+
+def transient(name):
+    """Excepción con el nombre de una de httpx, sin depender de httpx"""
+    return type(name, (Exception,), {})("timeout")
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_quota_and_server_errors_are_retryable(self):
+        self.assertEqual(classify(APIError(429)), RETRYABLE)
+        self.assertEqual(classify(APIError(503)), RETRYABLE)
+
+    def test_bad_request_is_fatal(self):
+        self.assertEqual(classify(APIError(400)), FATAL)
+
+    def test_httpx_timeouts_are_retryable_by_name(self):
+        for name in ("ReadTimeout", "ConnectTimeout", "PoolTimeout"):
+            self.assertEqual(classify(transient(name)), RETRYABLE, name)
+
+    def test_subclass_of_a_transient_name_is_retryable(self):
+        base = type("TimeoutException", (Exception,), {})
+        error = type("CustomTimeout", (base,), {})()
+        self.assertEqual(classify(error), RETRYABLE)
+
+    def test_unknown_exception_is_fatal(self):
+        self.assertEqual(classify(ValueError("bad prompt")), FATAL)
+
+
+class RetryAfterTest(unittest.TestCase):
+    def test_retry_after_header(self):
+        self.assertEqual(retry_after(APIError(429, headers={"retry-after": "7"})), 7.0)
+
+    def test_http_date_header_is_ignored(self):
+        error = APIError(429, headers={"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"})
+        self.assertIsNone(retry_after(error))
+
+    def test_retry_info_delay(self):
+        details = {
+            "error": {
+                "code": 429,
+                "details": [
+                    {"@type": "type.googleapis.com/google.rpc.ErrorInfo"},
+                    {
+                        "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                        "retryDelay": "12.5s",
+                    },
+                ],
+            }
+        }
+        self.assertEqual(retry_after(APIError(429, details=details)), 12.5)
+
+    def test_no_hint(self):
+        self.assertIsNone(retry_after(APIError(503)))
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_max_retries_boundary(self):
+        policy = RetryPolicy(max_retries=2)
+        error = APIError(503)
+        self.assertTrue(policy.should_retry(error, 1))
+        self.assertTrue(policy.should_retry(error, 2))
+        self.assertFalse(policy.should_retry(error, 3))
+
+    def test_zero_retries(self):
+        self.assertFalse(RetryPolicy(max_retries=0).should_retry(APIError(429), 1))
+
+    def test_fatal_errors_are_never_retried(self):
+        self.assertFalse(RetryPolicy().should_retry(APIError(400), 1))
+
+    def test_delay_follows_the_hint(self):
+        policy = RetryPolicy(max_delay=60)
+        error = APIError(429, headers={"retry-after": "10"})
+        for _ in range(50):
+            self.assertTrue(10 <= policy.delay(error, 1) <= 12.5)
+
+    def test_delay_is_capped(self):
+        policy = RetryPolicy(base_delay=2, max_delay=5)
+        hinted = APIError(429, headers={"retry-after": "120"})
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.delay(APIError(503), attempt), 5)
+        self.assertLessEqual(policy.delay(hinted, 1), 5 * 1.25)
+
+
+if __name__ == "__main__":
+    unittest.main()